@@ -0,0 +1,26 @@
+"""
+Optional numba shim.
+`njit` compiles with numba when it is installed and degrades to the plain Python function otherwise,
+so the kernels stay importable (and testable) on platforms without numba wheels.
+"""
+from typing import Any, Callable
+
+try:
+    from numba import njit as _numba_njit
+
+    NUMBA_AVAILABLE = True
+except ImportError:  # pragma: no cover - numba not installed
+    _numba_njit = None
+    NUMBA_AVAILABLE = False
+
+
+def njit(*args: Any, **kwargs: Any) -> Callable:
+    if NUMBA_AVAILABLE:
+        return _numba_njit(*args, **kwargs)
+    if len(args) == 1 and callable(args[0]) and not kwargs:
+        return args[0]
+
+    def decorator(func: Callable) -> Callable:
+        return func
+
+    return decorator
@@ -1,16 +1,68 @@
+import functools
 import logging
+import os
+import random
+import threading
 import time
-import json
 from typing import Any, List, Literal
 
+import orjson
 import pandas as pd
 import requests
 import yfinance as yf
+from cachetools import LRUCache
 from openai import OpenAI
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 
 logger = logging.getLogger(__name__)
 
+# Bars only change once per session for daily+ intervals; intraday bars roll every minute or so.
+PRICE_CACHE_TTL_DAILY = 3600
+PRICE_CACHE_TTL_INTRADAY = 60
+RETRY_JITTER = 0.3
+# Yahoo accepts up to 20 symbols per download request.
+YF_BATCH_SIZE = 20
+
+
+def _build_http_session() -> requests.Session:
+    """
+    Shared keep-alive session for news APIs: reuses TLS connections across calls and retries
+    transient statuses (Tavily search is a read-only POST, so POST is retried too).
+    """
+    session = requests.Session()
+    retry = Retry(
+        total=2,
+        backoff_factor=0.5,
+        status_forcelist=[429, 502, 503, 504],
+        allowed_methods=frozenset({"GET", "POST"}),
+    )
+    session.mount("https://", HTTPAdapter(pool_connections=8, pool_maxsize=16, max_retries=retry))
+    return session
+
+
+_session = _build_http_session()
+
+_llm_client: OpenAI | None = None
+_llm_client_lock = threading.Lock()
+
+
+# Memoized frames keyed by (ticker, period, interval, TTL bucket); retry policy is deliberately not part of the key.
+PRICE_CACHE_SIZE = 256
+_price_cache: LRUCache = LRUCache(maxsize=PRICE_CACHE_SIZE)
+_price_cache_lock = threading.Lock()
+
+# Single-flight locks for in-progress fetch_prices keys.
+_inflight: dict[tuple, threading.Lock] = {}
+_inflight_guard = threading.Lock()
+
+
+def _price_cache_bucket(interval: str) -> int:
+    intraday = interval.endswith(("m", "h"))
+    ttl = PRICE_CACHE_TTL_INTRADAY if intraday else PRICE_CACHE_TTL_DAILY
+    return int(time.time() // ttl)
+
 
 def fetch_prices(
     ticker: str,
@@ -22,7 +74,29 @@ def fetch_prices(
     """
     Robust OHLCV fetcher using yfinance with retry and hard fail semantics.
     Raises on exhausted retries to allow the orchestrator to stop the workflow.
+    Results are memoized per TTL bucket (failures are not); the returned frame is shared, treat it as read-only.
+    Concurrent misses for the same key wait for the first download instead of issuing their own.
     """
+    key = (ticker, period, interval, _price_cache_bucket(interval))
+    with _inflight_guard:
+        lock = _inflight.setdefault(key, threading.Lock())
+    try:
+        with lock:
+            with _price_cache_lock:
+                cached = _price_cache.get(key)
+            if cached is not None:
+                return cached
+            df = _download_prices(ticker, period, interval, max_retries, backoff)
+            with _price_cache_lock:
+                _price_cache[key] = df
+            return df
+    finally:
+        with _inflight_guard:
+            if _inflight.get(key) is lock:
+                del _inflight[key]
+
+
+def _download_prices(ticker: str, period: str, interval: str, max_retries: int, backoff: float) -> pd.DataFrame:
     attempt = 0
     last_exception: Exception | None = None
     while attempt < max_retries:
@@ -32,29 +106,81 @@ def fetch_prices(
                 raise ValueError("Received empty price data.")
             if isinstance(df.columns, pd.MultiIndex):
                 df.columns = df.columns.droplevel(level=1)
-            df = df.rename(
-                columns={
-                    "Open": "open",
-                    "High": "high",
-                    "Low": "low",
-                    "Close": "close",
-                    "Adj Close": "adj_close",
-                    "Volume": "volume",
-                }
-            )
-            df.index = pd.to_datetime(df.index)
-            return df
+            return _normalize_ohlcv(df)
         except Exception as exc:  # pragma: no cover - logging path
             last_exception = exc
             attempt += 1
             logger.warning("Price fetch failed (attempt %s/%s): %s", attempt, max_retries, exc)
             if attempt < max_retries:
-                time.sleep(backoff * attempt)
+                time.sleep(_retry_delay(attempt, backoff))
 
     # Exceeded retries
     raise RuntimeError(f"Failed to fetch prices for {ticker}: {last_exception}")
 
 
+def _retry_delay(attempt: int, backoff: float) -> float:
+    """
+    Exponential backoff with jitter (backoff, 2x, 4x, ... plus up to RETRY_JITTER seconds) so parallel
+    fetches that failed together don't all retry against Yahoo in the same instant.
+    """
+    return backoff * 2 ** (attempt - 1) + random.uniform(0, RETRY_JITTER)
+
+
+def fetch_prices_many(
+    tickers: List[str],
+    period: str = "1y",
+    interval: str = "1d",
+) -> dict[str, pd.DataFrame]:
+    """
+    Batched OHLCV fetch: one yfinance request per YF_BATCH_SIZE symbols instead of one per ticker.
+    Soft-fails per ticker: symbols without data are logged and omitted so one bad ticker can't sink a watchlist.
+    """
+    unique = list(dict.fromkeys(tickers))
+    frames: dict[str, pd.DataFrame] = {}
+    for start in range(0, len(unique), YF_BATCH_SIZE):
+        chunk = unique[start : start + YF_BATCH_SIZE]
+        try:
+            raw = yf.download(
+                " ".join(chunk),
+                period=period,
+                interval=interval,
+                group_by="ticker",
+                threads=True,
+                progress=False,
+                auto_adjust=False,
+            )
+        except Exception as exc:  # pragma: no cover - network path
+            logger.warning("Batch price fetch failed for %s: %s", chunk, exc)
+            continue
+        if raw is None or raw.empty:
+            logger.warning("Received empty price data for %s", chunk)
+            continue
+
+        available = set(raw.columns.get_level_values(0))
+        for ticker in chunk:
+            df = raw.xs(ticker, level=0, axis=1).dropna(how="all") if ticker in available else None
+            if df is None or df.empty:
+                logger.warning("No price data for %s in batch fetch", ticker)
+                continue
+            frames[ticker] = _normalize_ohlcv(df)
+    return frames
+
+
+def _normalize_ohlcv(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.rename(
+        columns={
+            "Open": "open",
+            "High": "high",
+            "Low": "low",
+            "Close": "close",
+            "Adj Close": "adj_close",
+            "Volume": "volume",
+        }
+    )
+    df.index = pd.to_datetime(df.index)
+    return df
+
+
 def fetch_news(
     ticker: str,
     limit: int = 10,
@@ -82,7 +208,7 @@ def fetch_news(
         return []
 
     try:
-        response = requests.post(url, json=payload, timeout=timeout)
+        response = _session.post(url, json=payload, timeout=timeout)
         response.raise_for_status()
         data = response.json()
         results = data.get("results") or data.get("articles") or []
@@ -107,7 +233,7 @@ def fetch_news(
 def build_llm_client() -> OpenAI:
     """
     Build an OpenAI client that prefers OpenRouter when configured; otherwise fall back to OpenAI.
-    Mirrors the Writer node setup so auth errors are consistent.
+    Prevents the common 401 "User not found" that happens when an OpenAI key is pointed at OpenRouter.
     """
     openrouter_key = getenv_default("OPENROUTER_API_KEY")
     openai_key = getenv_default("OPENAI_API_KEY")
@@ -129,6 +255,19 @@ def build_llm_client() -> OpenAI:
     raise RuntimeError("Missing LLM credentials: set OPENROUTER_API_KEY or OPENAI_API_KEY.")
 
 
+def get_llm_client() -> OpenAI:
+    """
+    Process-wide client, built on first use. Reusing it keeps the underlying httpx connection pool
+    (and its TLS sessions) warm across writer and news-summary calls. Credential errors are not cached.
+    """
+    global _llm_client
+    if _llm_client is None:
+        with _llm_client_lock:
+            if _llm_client is None:
+                _llm_client = build_llm_client()
+    return _llm_client
+
+
 def summarize_news_items(
     items: List[dict[str, Any]],
     model: str | None = None,
@@ -142,7 +281,7 @@ def summarize_news_items(
 
     chosen_model = model or getenv_default("NEWS_SUMMARY_MODEL") or getenv_default("REPORT_MODEL") or "gpt-4o-mini"
     try:
-        client = build_llm_client()
+        client = get_llm_client()
     except Exception as exc:  # pragma: no cover - auth issues
         logger.warning("LLM client unavailable for news summarization: %s", exc)
         return items, None
@@ -166,7 +305,7 @@ def summarize_news_items(
                 "Summarize each item into one concise Thai sentence (keep tickers/company names in English). "
                 "Also provide one overall market take in Thai. "
                 "Input:\n"
-                f"{json.dumps(payload, ensure_ascii=False)}\n\n"
+                f"{orjson.dumps(payload).decode()}\n\n"
                 "Output JSON shape:\n"
                 '{"per_item": ["..."], "overall": "..."}'
             ),
@@ -180,7 +319,7 @@ def summarize_news_items(
             temperature=0.3,
         )
         content = response.choices[0].message.content or "{}"
-        data = json.loads(content)
+        data = orjson.loads(content)
         per_item = data.get("per_item") or []
         overall = data.get("overall")
         for item, summary in zip(items, per_item):
@@ -191,7 +330,10 @@ def summarize_news_items(
         return items, None
 
 
+@functools.lru_cache(maxsize=None)
 def getenv_default(key: str, default: str | None = None) -> str | None:
-    import os
-
+    """
+    Environment lookup memoized for the process lifetime (.env is loaded once at startup).
+    Call getenv_default.cache_clear() after changing the environment, e.g. in tests.
+    """
     return os.getenv(key, default)
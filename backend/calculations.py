@@ -1,30 +1,191 @@
-from typing import Dict
+import math
+import threading
+from dataclasses import dataclass
+from typing import Dict, Mapping, Optional
 
+import numpy as np
 import pandas as pd
 
+from backend._njit import NUMBA_AVAILABLE
+from backend.calculations_numba import RSI_PERIOD, SERIES_NAMES, _compute_all, _compute_many
 
-def compute_indicators(prices: pd.DataFrame) -> Dict[str, float | dict]:
+
+_NO_SERIES = np.empty((len(SERIES_NAMES), 0), dtype=np.float64)
+
+# One entry per ticker: (fingerprint, indicators). A new bar (or a revised last close) replaces the entry.
+INDICATOR_CACHE_SIZE = 256
+_indicator_cache: dict[str, tuple[tuple, Dict[str, float | dict]]] = {}
+_indicator_cache_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class PricesSoA:
+    """
+    Structure-of-arrays view of an OHLCV frame: one C-contiguous float64 array per field plus the bar index.
+    Built once at the boundary (see to_soa) and handed straight to the kernels, skipping pandas per access.
+    Only `close` is required by the indicators; other fields are None when the source frame lacks them.
+    """
+
+    index: pd.Index
+    close: np.ndarray
+    open: Optional[np.ndarray] = None
+    high: Optional[np.ndarray] = None
+    low: Optional[np.ndarray] = None
+    volume: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return self.close.shape[0]
+
+
+def to_soa(prices: pd.DataFrame | PricesSoA) -> PricesSoA:
+    """
+    Bars with a missing or non-finite close are dropped here: the kernels carry running sums and EMAs, so one
+    NaN would otherwise poison every later value (pandas rolling/ewm skip NaN and recover).
+    """
+    if isinstance(prices, PricesSoA):
+        soa = prices
+    else:
+        # C-contiguous float64 (no copy in the common case) so every call matches a precompiled kernel signature.
+        columns = {
+            col: np.ascontiguousarray(prices[col].to_numpy(dtype=np.float64, copy=False))
+            for col in ("open", "high", "low", "close", "volume")
+            if col in prices.columns
+        }
+        soa = PricesSoA(prices.index, **columns)
+
+    finite = np.isfinite(soa.close)
+    if finite.all():
+        return soa
+    return PricesSoA(
+        soa.index[finite],
+        **{
+            col: getattr(soa, col)[finite]
+            for col in ("open", "high", "low", "close", "volume")
+            if getattr(soa, col) is not None
+        },
+    )
+
+
+def compute_indicators(prices: pd.DataFrame | PricesSoA, ticker: str | None = None) -> Dict[str, float | dict]:
     """
     Deterministic technical indicator computation (no LLM involvement).
     Returns raw float values to be consumed by downstream agents/critic.
+    Pass `ticker` to memoize by (last bar, bar count, last close); cached dicts are shared, treat them as read-only.
     """
-    if prices.empty:
+    soa = to_soa(prices)
+    if len(soa) == 0:
         raise ValueError("Price dataframe is empty.")
+    if ticker is None:
+        return _compute_from_soa(soa)
+
+    fingerprint = (soa.index[-1], len(soa), float(soa.close[-1]))
+    cached = _indicator_cache.get(ticker)
+    if cached is not None and cached[0] == fingerprint:
+        return cached[1]
+
+    indicators = _compute_from_soa(soa)
+    with _indicator_cache_lock:
+        _indicator_cache.pop(ticker, None)
+        if len(_indicator_cache) >= INDICATOR_CACHE_SIZE:
+            _indicator_cache.pop(next(iter(_indicator_cache)))
+        _indicator_cache[ticker] = (fingerprint, indicators)
+    return indicators
+
 
-    df = prices.copy()
+def compute_indicators_many(prices: Mapping[str, pd.DataFrame | PricesSoA]) -> Dict[str, Dict[str, float | dict]]:
+    """
+    Batch form of compute_indicators for watchlists: every ticker's closes are packed into one ragged buffer
+    and walked by a single kernel call, so dispatch is paid once per batch instead of per ticker.
+    Ticker histories may have different lengths.
+    """
+    soas = {ticker: to_soa(frame) for ticker, frame in prices.items()}
+    empty = [ticker for ticker, soa in soas.items() if len(soa) == 0]
+    if empty:
+        raise ValueError(f"Price dataframe is empty for {', '.join(empty)}.")
+    if not soas:
+        return {}
+    if not NUMBA_AVAILABLE:
+        return {ticker: _compute_from_soa(soa) for ticker, soa in soas.items()}
+
+    offsets = np.zeros(len(soas) + 1, dtype=np.int64)
+    np.cumsum([len(soa) for soa in soas.values()], out=offsets[1:])
+    close = np.concatenate([soa.close for soa in soas.values()])
+    results = np.empty((len(soas), 10), dtype=np.float64)
+    _compute_many(close, offsets, results)
+    return {ticker: _indicator_dict(*row) for ticker, row in zip(soas, results.tolist())}
+
+
+def _compute_from_soa(soa: PricesSoA) -> Dict[str, float | dict]:
+    if not NUMBA_AVAILABLE:
+        # Vectorized pandas beats the interpreted kernel when numba is missing.
+        return _compute_indicators_pandas(pd.DataFrame({"close": soa.close}, index=soa.index))
+    return _indicator_dict(*_compute_all(soa.close, _NO_SERIES))
+
+
+def _indicator_dict(
+    rsi: float,
+    macd: float,
+    signal: float,
+    hist: float,
+    sma50: float,
+    sma200: float,
+    ema20: float,
+    upper: float,
+    middle: float,
+    lower: float,
+) -> Dict[str, float | dict]:
+    bandwidth = (upper - lower) / middle if middle != 0 else 0.0
+    return _with_signals(
+        {
+            "rsi_14": float(rsi),
+            "macd": {"macd": float(macd), "signal": float(signal), "histogram": float(hist)},
+            "sma_50": float(sma50),
+            "sma_200": float(sma200),
+            "ema_20": float(ema20),
+            "bollinger_bands": {
+                "upper": float(upper),
+                "middle": float(middle),
+                "lower": float(lower),
+                "bandwidth": 0.0 if math.isnan(bandwidth) else float(bandwidth),
+            },
+        }
+    )
+
+
+def compute_indicator_series(prices: pd.DataFrame | PricesSoA) -> Dict[str, np.ndarray]:
+    """
+    Full-length indicator arrays for chart overlays, aligned with `to_soa(prices).index` (bars with a
+    non-finite close dropped).
+    SMAs use expanding windows until full so short timeframes still render; RSI is NaN where undefined.
+    """
+    close = to_soa(prices).close
+    out = np.empty((len(SERIES_NAMES), close.shape[0]), dtype=np.float64)
+    if close.shape[0]:
+        _compute_all(close, out)
+    return dict(zip(SERIES_NAMES, out))
+
+
+def _compute_indicators_pandas(prices: pd.DataFrame) -> Dict[str, float | dict]:
+    """
+    Reference pandas implementation; used when numba is unavailable and for kernel parity tests.
+    """
     indicators: Dict[str, float | dict] = {}
 
-    close = df["close"]
+    # Read-only: every step below builds new Series, so the input frame is never copied or mutated.
+    close = prices["close"]
 
-    # RSI (Wilder's smoothing)
-    delta = close.diff()
-    gain = delta.clip(lower=0)
-    loss = -delta.clip(upper=0)
-    avg_gain = gain.ewm(alpha=1 / 14, adjust=False).mean()
-    avg_loss = loss.ewm(alpha=1 / 14, adjust=False).mean()
-    rs = avg_gain / avg_loss.replace(0, pd.NA)
+    # RSI (Wilder's smoothing). Gains/losses are plain ndarray ufuncs; the leading NaN diff propagates through
+    # np.maximum, so the RMA is still seeded from the first real diff as with Series.diff().
+    delta = np.diff(close.to_numpy(dtype=np.float64), prepend=np.nan)
+    gain = pd.Series(np.maximum(delta, 0.0))
+    loss = pd.Series(np.maximum(-delta, 0.0))
+    avg_gain = gain.ewm(alpha=1 / RSI_PERIOD, adjust=False).mean()
+    avg_loss = loss.ewm(alpha=1 / RSI_PERIOD, adjust=False).mean()
+    # Plain float64 division: gains without losses give rs=inf (RSI 100), a flat series 0/0=NaN.
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = avg_gain.to_numpy() / avg_loss.to_numpy()
     rsi_series = 100 - (100 / (1 + rs))
-    indicators["rsi_14"] = float(rsi_series.iloc[-1])
+    indicators["rsi_14"] = float(rsi_series[-1])
 
     # MACD (12, 26, 9)
     ema_fast = close.ewm(span=12, adjust=False).mean()
@@ -47,23 +208,28 @@ def compute_indicators(prices: pd.DataFrame) -> Dict[str, float | dict]:
     indicators["ema_20"] = float(ema20.iloc[-1])
 
     # Bollinger Bands (20, 2)
-    rolling_mean = close.rolling(window=20, min_periods=20).mean()
-    rolling_std = close.rolling(window=20, min_periods=20).std(ddof=0)
+    window = close.rolling(window=20, min_periods=20)
+    rolling_mean = window.mean()
+    rolling_std = window.std(ddof=0)
     upper = rolling_mean + 2 * rolling_std
     lower = rolling_mean - 2 * rolling_std
-    bandwidth = (upper - lower) / rolling_mean.replace(0, pd.NA)
+    mean_arr = rolling_mean.to_numpy()
+    bandwidth = (upper - lower).to_numpy() / np.where(mean_arr == 0, np.nan, mean_arr)
     indicators["bollinger_bands"] = {
         "upper": float(upper.iloc[-1]),
         "middle": float(rolling_mean.iloc[-1]),
         "lower": float(lower.iloc[-1]),
-        "bandwidth": float(bandwidth.fillna(0).iloc[-1]),
+        "bandwidth": float(np.nan_to_num(bandwidth[-1], nan=0.0)),
     }
 
+    return _with_signals(indicators)
+
+
+def _with_signals(indicators: Dict[str, float | dict]) -> Dict[str, float | dict]:
     # Rule-based signals
     indicators["signals"] = {
         "trend": "Uptrend" if indicators["sma_50"] > indicators["sma_200"] else "Downtrend",
         "rsi_state": "Oversold" if indicators["rsi_14"] < 30 else "Overbought" if indicators["rsi_14"] > 70 else "Neutral",
         "macd_cross": "Bullish" if indicators["macd"]["macd"] > indicators["macd"]["signal"] else "Bearish",
     }
-
     return indicators
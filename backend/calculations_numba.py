@@ -0,0 +1,181 @@
+"""
+Single-pass indicator kernel.
+Walks `close` once and keeps every indicator as running state (Wilder RMA, EMAs, rolling sums, Welford window)
+instead of materializing one pandas Series per intermediate step. Semantics match the pandas formulas in
+`backend.calculations._compute_indicators_pandas` (ewm adjust=False, rolling ddof=0). Inputs must be finite;
+`backend.calculations.to_soa` drops bars with a non-finite close before they reach the kernels.
+"""
+import math
+
+import numpy as np
+
+from backend._njit import njit
+
+
+RSI_PERIOD = 14
+MACD_FAST = 12
+MACD_SLOW = 26
+MACD_SIGNAL = 9
+EMA_SPAN = 20
+SMA_SHORT = 50
+SMA_LONG = 200
+BB_WINDOW = 20
+BB_STD = 2.0
+
+# Row layout of the optional `out` array filled by `_compute_all`.
+SERIES_NAMES = ("sma50", "sma200", "ema20", "rsi", "macd", "signal", "histogram")
+SMA50_ROW, SMA200_ROW, EMA20_ROW, RSI_ROW, MACD_ROW, SIGNAL_ROW, HIST_ROW = range(len(SERIES_NAMES))
+
+# Everything except the no-NaN/no-inf assumptions, which would break the NaN outputs for short histories.
+_FASTMATH = {"nsz", "arcp", "contract", "afn"}
+
+# Explicit signatures make numba compile (or load from the on-disk cache) at import instead of on the first
+# request. Both close layouts seen in practice are listed: writable arrays and read-only pandas
+# copy-on-write views. Callers pass C-contiguous float64 (see backend.calculations.to_soa).
+_COMPUTE_ALL_SIGNATURES = [
+    "UniTuple(float64, 10)(float64[::1], float64[:, ::1])",
+    "UniTuple(float64, 10)(Array(float64, 1, 'C', readonly=True), float64[:, ::1])",
+]
+
+
+@njit(inline="always")
+def _ewm_step(prev: float, x: float, alpha: float) -> float:
+    """
+    One step of pandas ewm(adjust=False): y_t = y_{t-1} + alpha * (x_t - y_{t-1}).
+    EMAs use alpha = 2 / (span + 1); Wilder's RMA is the same recurrence with alpha = 1 / period.
+    """
+    return prev + alpha * (x - prev)
+
+
+@njit(inline="always")
+def _rsi_value(avg_gain: float, avg_loss: float) -> float:
+    """
+    Wilder RSI from the smoothed gain/loss: 100 when there are gains but no losses, NaN only for a flat series.
+    """
+    if avg_loss != 0.0:
+        return 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    return 100.0 if avg_gain > 0.0 else np.nan
+
+
+@njit(_COMPUTE_ALL_SIGNATURES, cache=True, fastmath=_FASTMATH, boundscheck=False)
+def _compute_all(close: np.ndarray, out: np.ndarray) -> tuple:
+    """
+    Returns (rsi, macd, signal, histogram, sma50, sma200, ema20, bb_upper, bb_middle, bb_lower)
+    for the last bar. Windowed outputs are NaN until enough bars are available.
+
+    When `out` has shape (len(SERIES_NAMES), len(close)) the per-bar series are written into it in the
+    same pass (SMAs over expanding windows until full, RSI NaN where undefined); pass a (k, 0) array
+    to skip them.
+    """
+    n = close.shape[0]
+    fill = out.shape[1] == n
+    a_rsi = 1.0 / RSI_PERIOD
+    a_fast = 2.0 / (MACD_FAST + 1)
+    a_slow = 2.0 / (MACD_SLOW + 1)
+    a_signal = 2.0 / (MACD_SIGNAL + 1)
+    a_ema = 2.0 / (EMA_SPAN + 1)
+
+    first = close[0]
+    ema_fast = first
+    ema_slow = first
+    signal = 0.0
+    ema20 = first
+    avg_gain = 0.0
+    avg_loss = 0.0
+    sum_short = first
+    sum_long = first
+    bb_mean = first
+    bb_m2 = 0.0
+
+    if fill:
+        out[SMA50_ROW, 0] = first
+        out[SMA200_ROW, 0] = first
+        out[EMA20_ROW, 0] = first
+        out[RSI_ROW, 0] = np.nan
+        out[MACD_ROW, 0] = 0.0
+        out[SIGNAL_ROW, 0] = 0.0
+        out[HIST_ROW, 0] = 0.0
+
+    for i in range(1, n):
+        x = close[i]
+        prev = close[i - 1]
+
+        # RSI: the first diff seeds Wilder's RMA (pandas skips the leading NaN diff)
+        delta = x - prev
+        gain = delta if delta > 0.0 else 0.0
+        loss = -delta if delta < 0.0 else 0.0
+        if i == 1:
+            avg_gain = gain
+            avg_loss = loss
+        else:
+            avg_gain = _ewm_step(avg_gain, gain, a_rsi)
+            avg_loss = _ewm_step(avg_loss, loss, a_rsi)
+
+        # MACD / EMA
+        ema_fast = _ewm_step(ema_fast, x, a_fast)
+        ema_slow = _ewm_step(ema_slow, x, a_slow)
+        # signal is seeded from the bar-0 MACD value, which is always 0.0
+        signal = _ewm_step(signal, ema_fast - ema_slow, a_signal)
+        ema20 = _ewm_step(ema20, x, a_ema)
+
+        # SMA running sums
+        sum_short += x
+        if i >= SMA_SHORT:
+            sum_short -= close[i - SMA_SHORT]
+        sum_long += x
+        if i >= SMA_LONG:
+            sum_long -= close[i - SMA_LONG]
+
+        # Bollinger: Welford over a sliding window
+        if i < BB_WINDOW:
+            d = x - bb_mean
+            bb_mean += d / (i + 1)
+            bb_m2 += d * (x - bb_mean)
+        else:
+            old = close[i - BB_WINDOW]
+            new_mean = bb_mean + (x - old) / BB_WINDOW
+            bb_m2 += (x - old) * (x - new_mean + old - bb_mean)
+            bb_mean = new_mean
+
+        if fill:
+            macd_i = ema_fast - ema_slow
+            out[SMA50_ROW, i] = sum_short / min(i + 1, SMA_SHORT)
+            out[SMA200_ROW, i] = sum_long / min(i + 1, SMA_LONG)
+            out[EMA20_ROW, i] = ema20
+            out[RSI_ROW, i] = _rsi_value(avg_gain, avg_loss)
+            out[MACD_ROW, i] = macd_i
+            out[SIGNAL_ROW, i] = signal
+            out[HIST_ROW, i] = macd_i - signal
+
+    rsi = _rsi_value(avg_gain, avg_loss) if n > 1 else np.nan
+
+    macd = ema_fast - ema_slow
+    sma50 = sum_short / SMA_SHORT if n >= SMA_SHORT else np.nan
+    sma200 = sum_long / SMA_LONG if n >= SMA_LONG else np.nan
+
+    if n >= BB_WINDOW:
+        std = math.sqrt(max(bb_m2 / BB_WINDOW, 0.0))
+        bb_middle = bb_mean
+        bb_upper = bb_mean + BB_STD * std
+        bb_lower = bb_mean - BB_STD * std
+    else:
+        bb_middle = np.nan
+        bb_upper = np.nan
+        bb_lower = np.nan
+
+    return (rsi, macd, signal, macd - signal, sma50, sma200, ema20, bb_upper, bb_middle, bb_lower)
+
+
+@njit(["void(float64[::1], int64[::1], float64[:, ::1])"], cache=True, boundscheck=False)
+def _compute_many(close: np.ndarray, offsets: np.ndarray, results: np.ndarray) -> None:
+    """
+    Batched `_compute_all` over a ragged (CSR) layout: ticker k owns `close[offsets[k]:offsets[k + 1]]`.
+    Row k of `results` receives ticker k's `_compute_all` tuple; one dispatch covers the whole watchlist.
+    Deliberately serial: a parallel region would gain little at watchlist sizes, and concurrent requests
+    entering one from FastAPI's threadpool abort the process under numba's default workqueue layer.
+    """
+    no_series = np.empty((len(SERIES_NAMES), 0), dtype=np.float64)
+    for k in range(offsets.shape[0] - 1):
+        values = _compute_all(close[offsets[k] : offsets[k + 1]], no_series)
+        for j in range(len(values)):
+            results[k, j] = values[j]
@@ -1,14 +1,20 @@
 import asyncio
+import threading
 import uuid
-from typing import Any, Dict, Literal, Tuple
+from dataclasses import dataclass, field
+from typing import Any, Dict, Literal, Mapping, MutableMapping, Optional, Tuple
 
+import numpy as np
+import orjson
 import pandas as pd
-from fastapi import BackgroundTasks, FastAPI, HTTPException
+from cachetools import LRUCache, TTLCache
+from fastapi import BackgroundTasks, FastAPI, HTTPException, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 
-from backend.agents.graph import run_workflow
-from backend.agents.tools import fetch_news, fetch_prices, summarize_news_items
+from backend.agents.graph import run_workflow_async
+from backend.agents.tools import fetch_news, fetch_prices, fetch_prices_many, summarize_news_items
+from backend.calculations import PricesSoA, compute_indicator_series, compute_indicators_many, to_soa
 
 
 # Load environment variables from .env (local dev convenience)
@@ -26,83 +32,184 @@ app.add_middleware(
 
 
 TaskStatus = Literal["pending", "running", "complete", "error"]
-tasks: Dict[str, Dict[str, Any]] = {}
+CandleLayout = Literal["rows", "columns"]
+TASK_TTL_SECONDS = 3600
 
 
-def df_to_ohlcv(df: pd.DataFrame) -> list[dict[str, Any]]:
-    candles: list[dict[str, Any]] = []
-    for row in df.itertuples():
-        ts = getattr(row, "Index")
-        time_str = ts.date().isoformat() if hasattr(ts, "date") else str(ts)
-        candles.append(
-            {
-                "time": time_str,
-                "open": float(row.open),
-                "high": float(row.high),
-                "low": float(row.low),
-                "close": float(row.close),
-                "volume": float(row.volume),
-            }
-        )
-    return candles
+@dataclass(slots=True)
+class TaskState:
+    """
+    One analyze task. `done` lets long-polling clients await completion; it is never serialized.
+    """
+
+    status: TaskStatus = "pending"
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    done: asyncio.Event = field(default_factory=asyncio.Event)
+
+    def snapshot(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {"status": self.status}
+        if self.result is not None:
+            out["result"] = self.result
+        if self.error is not None:
+            out["error"] = self.error
+        return out
 
 
-def indicator_series(df: pd.DataFrame) -> Tuple[dict[str, list[dict[str, Any]]], list[dict[str, Any]], dict[str, list[dict[str, Any]]]]:
+class TaskStore(TTLCache):
+    """
+    Bounded, TTL'd task map. Plain dicts assigned to it are converted to TaskState on the way in.
+    """
+
+    def __setitem__(self, key: str, value: TaskState | Mapping[str, Any], **kwargs: Any) -> None:
+        if not isinstance(value, TaskState):
+            value = TaskState(**value)
+        super().__setitem__(key, value, **kwargs)
+
+
+tasks: MutableMapping[str, TaskState] = TaskStore(maxsize=1024, ttl=TASK_TTL_SECONDS)
+# Ids outlive their tasks so polling an expired task answers 410 instead of 404.
+_issued_task_ids: MutableMapping[str, bool] = TTLCache(maxsize=8192, ttl=24 * TASK_TTL_SECONDS)
+
+# Serialized /api/market/history bodies keyed by request, validated against a fingerprint of the prices.
+_history_cache: MutableMapping[tuple[str, str, str, str], tuple[tuple, bytes]] = LRUCache(maxsize=256)
+_history_cache_lock = threading.Lock()
+
+
+def _time_labels(index: pd.Index) -> list[str]:
+    if isinstance(index, pd.DatetimeIndex):
+        return index.strftime("%Y-%m-%d").tolist()
+    return index.astype(str).tolist()
+
+
+def df_to_ohlcv(df: pd.DataFrame | PricesSoA) -> list[dict[str, Any]]:
+    # Column-wise extraction: one ndarray -> list conversion per field instead of a Python object per row.
+    soa = to_soa(df)
+    times = _time_labels(soa.index)
+    opens, highs, lows, closes, volumes = (col.tolist() for col in (soa.open, soa.high, soa.low, soa.close, soa.volume))
+    return [
+        {"time": t, "open": o, "high": h, "low": l, "close": c, "volume": v}
+        for t, o, h, l, c, v in zip(times, opens, highs, lows, closes, volumes)
+    ]
+
+
+def df_to_columns(df: pd.DataFrame | PricesSoA) -> dict[str, Any]:
+    """
+    Columnar candles: one array per field, serialized by orjson straight from the float64 buffers.
+    """
+    soa = to_soa(df)
+    return {
+        "time": _time_labels(soa.index),
+        "open": soa.open,
+        "high": soa.high,
+        "low": soa.low,
+        "close": soa.close,
+        "volume": soa.volume,
+    }
+
+
+def indicator_series(df: pd.DataFrame | PricesSoA) -> Tuple[dict[str, list[dict[str, Any]]], list[dict[str, Any]], dict[str, list[dict[str, Any]]]]:
     """
     Build lightweight-charts-ready series for SMA/EMA overlays plus RSI & MACD panels.
-    Uses min_periods=1 so short timeframes still render lines instead of empty overlays.
-    """
-    close = df["close"]
-
-    sma50 = close.rolling(window=50, min_periods=1).mean()
-    sma200 = close.rolling(window=200, min_periods=1).mean()
-    ema20 = close.ewm(span=20, adjust=False).mean()
-
-    delta = close.diff()
-    gain = delta.clip(lower=0)
-    loss = -delta.clip(upper=0)
-    avg_gain = gain.ewm(alpha=1 / 14, adjust=False).mean()
-    avg_loss = loss.ewm(alpha=1 / 14, adjust=False).mean()
-    rs = avg_gain / avg_loss.replace(0, pd.NA)
-    rsi_series = 100 - (100 / (1 + rs))
-
-    ema_fast = close.ewm(span=12, adjust=False).mean()
-    ema_slow = close.ewm(span=26, adjust=False).mean()
-    macd_line = ema_fast - ema_slow
-    signal_line = macd_line.ewm(span=9, adjust=False).mean()
-    macd_hist = macd_line - signal_line
-
-    def to_line(series: pd.Series) -> list[dict[str, Any]]:
-        return [
-            {"time": idx.date().isoformat() if hasattr(idx, "date") else str(idx), "value": float(val)}
-            for idx, val in series.dropna().items()
-        ]
+    All series come from one kernel pass (see compute_indicator_series); SMAs use expanding windows
+    so short timeframes still render lines instead of empty overlays.
+    """
+    soa = to_soa(df)
+    series = compute_indicator_series(soa)
+    # Format the timestamps once and share them across all six series.
+    times = np.asarray(_time_labels(soa.index), dtype=object)
+
+    def to_line(values: np.ndarray) -> list[dict[str, Any]]:
+        mask = ~np.isnan(values)
+        return [{"time": t, "value": v} for t, v in zip(times[mask].tolist(), values[mask].tolist())]
 
     overlays = {
-        "sma50": to_line(sma50),
-        "sma200": to_line(sma200),
-        "ema20": to_line(ema20),
+        "sma50": to_line(series["sma50"]),
+        "sma200": to_line(series["sma200"]),
+        "ema20": to_line(series["ema20"]),
     }
-    rsi = to_line(rsi_series)
+    rsi = to_line(series["rsi"])
     macd = {
-        "macd": to_line(macd_line),
-        "signal": to_line(signal_line),
-        "histogram": to_line(macd_hist),
+        "macd": to_line(series["macd"]),
+        "signal": to_line(series["signal"]),
+        "histogram": to_line(series["histogram"]),
     }
     return overlays, rsi, macd
 
 
+def indicator_columns(df: pd.DataFrame | PricesSoA) -> Tuple[dict[str, np.ndarray], np.ndarray, dict[str, np.ndarray]]:
+    """
+    Same series as indicator_series, as raw float64 arrays aligned with the candle times (NaN -> null in JSON).
+    No per-point objects are built; orjson writes the arrays directly.
+    """
+    series = compute_indicator_series(df)
+    overlays = {name: series[name] for name in ("sma50", "sma200", "ema20")}
+    macd = {name: series[name] for name in ("macd", "signal", "histogram")}
+    return overlays, series["rsi"], macd
+
+
+def _frame_fingerprint(soa: PricesSoA) -> tuple:
+    # Bar count + the full last bar: changes on a new bar and on intraday revisions of the current one.
+    return (len(soa), soa.index[-1], *(float(col[-1]) for col in (soa.open, soa.high, soa.low, soa.close, soa.volume)))
+
+
 @app.get("/api/market/history")
-def get_history(ticker: str, period: str = "1y", interval: str = "1d"):
-    df = fetch_prices(ticker, period=period, interval=interval)
-    overlays, rsi, macd = indicator_series(df)
-    return {
-        "ticker": ticker,
-        "candles": df_to_ohlcv(df),
-        "indicators": overlays,
-        "rsi": rsi,
-        "macd": macd,
-    }
+def get_history(ticker: str, period: str = "1y", interval: str = "1d", layout: CandleLayout = "rows"):
+    """
+    `layout=columns` returns candles as parallel arrays (`{"time": [...], "open": [...], ...}`) and every
+    indicator series as a bare value array aligned with `candles.time` (null where undefined), instead of
+    one object per point; the chart frontend uses the default row layout.
+    """
+    # Convert once; the fingerprint, candles and indicator series all read the same arrays.
+    soa = to_soa(fetch_prices(ticker, period=period, interval=interval))
+    key = (ticker, period, interval, layout)
+    fingerprint = _frame_fingerprint(soa)
+    with _history_cache_lock:
+        cached = _history_cache.get(key)
+    if cached is not None and cached[0] == fingerprint:
+        return Response(content=cached[1], media_type="application/json")
+
+    if layout == "columns":
+        candles = df_to_columns(soa)
+        overlays, rsi, macd = indicator_columns(soa)
+    else:
+        candles = df_to_ohlcv(soa)
+        overlays, rsi, macd = indicator_series(soa)
+    body = orjson.dumps(
+        {
+            "ticker": ticker,
+            "candles": candles,
+            "indicators": overlays,
+            "rsi": rsi,
+            "macd": macd,
+        },
+        option=orjson.OPT_SERIALIZE_NUMPY,
+    )
+    with _history_cache_lock:
+        _history_cache[key] = (fingerprint, body)
+    return Response(content=body, media_type="application/json")
+
+
+@app.get("/api/market/indicators")
+def get_indicators(tickers: str, period: str = "1y", interval: str = "1d"):
+    """
+    Latest indicator values for a comma-separated watchlist: one batched download, one batched kernel call.
+    Tickers without price data are listed under `missing` instead of failing the request.
+    """
+    symbols = list(dict.fromkeys(t.strip() for t in tickers.split(",") if t.strip()))
+    if not symbols:
+        raise HTTPException(status_code=422, detail="No tickers given")
+    frames = fetch_prices_many(symbols, period=period, interval=interval)
+    # Frames whose closes are all non-finite are empty after to_soa; report them instead of failing the batch.
+    soas = {t: to_soa(frame) for t, frame in frames.items()}
+    usable = {t: soa for t, soa in soas.items() if len(soa)}
+    body = orjson.dumps(
+        {
+            "indicators": compute_indicators_many(usable),
+            "missing": [t for t in symbols if t not in usable],
+        }
+    )
+    return Response(content=body, media_type="application/json")
 
 
 @app.get("/api/market/news")
@@ -113,27 +220,60 @@ def get_news(ticker: str, limit: int = 10):
 
 
 async def _run_task(task_id: str, ticker: str):
-    tasks[task_id]["status"] = "running"
+    task = tasks.get(task_id)
+    if task is None:
+        return
+    task.status = "running"
     try:
-        result = await asyncio.get_event_loop().run_in_executor(None, run_workflow, ticker)
-        tasks[task_id]["status"] = "complete"
-        tasks[task_id]["result"] = result
+        result = await run_workflow_async(ticker)
+        task.status = "complete"
+        # The DataFrame is only needed inside the graph; don't pin it in memory for the task's lifetime.
+        task.result = {k: v for k, v in result.items() if k != "raw_prices"}
     except Exception as exc:
-        tasks[task_id]["status"] = "error"
-        tasks[task_id]["error"] = str(exc)
+        task.status = "error"
+        task.error = str(exc)
+    finally:
+        task.done.set()
 
 
 @app.post("/api/analyze")
 async def analyze(ticker: str, background_tasks: BackgroundTasks):
     task_id = str(uuid.uuid4())
-    tasks[task_id] = {"status": "pending"}
+    tasks[task_id] = TaskState()
+    _issued_task_ids[task_id] = True
     background_tasks.add_task(_run_task, task_id, ticker)
     return {"task_id": task_id, "status": "pending"}
 
 
-@app.get("/api/analyze/{task_id}")
-def get_analysis(task_id: str):
+def _lookup_task(task_id: str) -> TaskState:
     task = tasks.get(task_id)
-    if not task:
+    if task is None:
+        if task_id in _issued_task_ids:
+            raise HTTPException(status_code=410, detail="Task expired")
         raise HTTPException(status_code=404, detail="Task not found")
     return task
+
+
+def _task_response(task: TaskState) -> Response:
+    # orjson writes NaN indicators (e.g. sma_200 on a short history) as null; the default encoder rejects them.
+    return Response(content=orjson.dumps(task.snapshot()), media_type="application/json")
+
+
+@app.get("/api/analyze/{task_id}")
+async def get_analysis(task_id: str):
+    # Async on purpose: tasks and _issued_task_ids are unlocked TTLCaches, so every access stays on the event loop.
+    return _task_response(_lookup_task(task_id))
+
+
+@app.get("/api/analyze/{task_id}/wait")
+async def wait_for_analysis(task_id: str, timeout: float = Query(30.0, gt=0, le=60)):
+    """
+    Long-poll variant: returns as soon as the task finishes, or its current status after `timeout` seconds.
+    """
+    task = _lookup_task(task_id)
+    if task.status in ("pending", "running"):
+        try:
+            await asyncio.wait_for(task.done.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+    return _task_response(task)
@@ -1,3 +1,6 @@
+import asyncio
+
+import orjson
 import pytest
 from fastapi.testclient import TestClient
 
@@ -45,3 +48,120 @@ def test_analyze_sets_task_and_reports(monkeypatch):
     task = poll.json()
     assert task["status"] == "complete"
     assert task["result"]["draft_report"]["executive_summary"] == "ok"
+
+
+def test_poll_serializes_nan_indicators_as_null():
+    client = TestClient(main.app)
+    task_id = "nan-result"
+    main.tasks[task_id] = {
+        "status": "complete",
+        "result": {"technical_indicators": {"rsi_14": 55.0, "sma_200": float("nan")}},
+    }
+
+    for path in (f"/api/analyze/{task_id}", f"/api/analyze/{task_id}/wait"):
+        resp = client.get(path)
+        assert resp.status_code == 200
+        assert resp.json()["result"]["technical_indicators"] == {"rsi_14": 55.0, "sma_200": None}
+    main.tasks.pop(task_id)
+
+
+def test_expired_task_returns_gone(monkeypatch):
+    async def fake_workflow(ticker: str):
+        return {"ticker": ticker, "raw_prices": object(), "draft_report": {}}
+
+    monkeypatch.setattr(main, "run_workflow_async", fake_workflow)
+    client = TestClient(main.app)
+    task_id = client.post("/api/analyze?ticker=TEST").json()["task_id"]
+
+    assert "raw_prices" not in main.tasks[task_id].result
+
+    main.tasks.pop(task_id)
+    assert client.get(f"/api/analyze/{task_id}").status_code == 410
+    assert client.get("/api/analyze/unknown").status_code == 404
+
+
+def test_wait_for_analysis_returns_when_task_finishes():
+    task_id = "wait-test"
+    task = main.TaskState(status="running")
+    main.tasks[task_id] = task
+
+    async def finish_later():
+        await asyncio.sleep(0.05)
+        task.status = "complete"
+        task.result = {"draft_report": {}}
+        task.done.set()
+
+    async def scenario():
+        finisher = asyncio.create_task(finish_later())
+        resp = await main.wait_for_analysis(task_id, timeout=5)
+        await finisher
+        return orjson.loads(resp.body)
+
+    assert asyncio.run(scenario()) == {"status": "complete", "result": {"draft_report": {}}}
+
+    main.tasks[task_id] = main.TaskState(status="running")
+    assert orjson.loads(asyncio.run(main.wait_for_analysis(task_id, timeout=0.01)).body)["status"] == "running"
+    main.tasks.pop(task_id)
+
+
+def test_market_history_serves_cached_body_until_prices_change(monkeypatch, sample_prices):
+    frames = [sample_prices, sample_prices, sample_prices.iloc[:-1]]
+    computed = []
+    original = main.indicator_series
+
+    def counting_series(df):
+        computed.append(len(df))
+        return original(df)
+
+    monkeypatch.setattr(main, "fetch_prices", lambda ticker, period="1y", interval="1d": frames.pop(0))
+    monkeypatch.setattr(main, "indicator_series", counting_series)
+    main._history_cache.clear()
+    client = TestClient(main.app)
+
+    first = client.get("/api/market/history?ticker=CACHED").content
+    assert client.get("/api/market/history?ticker=CACHED").content == first
+    assert computed == [len(sample_prices)]
+
+    shorter = client.get("/api/market/history?ticker=CACHED").json()
+    assert computed == [len(sample_prices), len(sample_prices) - 1]
+    assert len(shorter["candles"]) == len(sample_prices) - 1
+    main._history_cache.clear()
+
+
+def test_market_history_columnar_candles(monkeypatch, sample_prices):
+    monkeypatch.setattr(main, "fetch_prices", lambda ticker, period="1y", interval="1d": sample_prices)
+    main._history_cache.clear()
+    client = TestClient(main.app)
+
+    rows = client.get("/api/market/history?ticker=COLS").json()
+    columns = client.get("/api/market/history?ticker=COLS&layout=columns").json()
+    main._history_cache.clear()
+
+    candles = columns["candles"]
+    assert set(candles) == {"time", "open", "high", "low", "close", "volume"}
+    assert [dict(zip(candles, bar)) for bar in zip(*candles.values())] == rows["candles"]
+
+    def to_pairs(values):
+        return [{"time": t, "value": v} for t, v in zip(candles["time"], values) if v is not None]
+
+    assert {name: to_pairs(values) for name, values in columns["indicators"].items()} == rows["indicators"]
+    assert to_pairs(columns["rsi"]) == rows["rsi"]
+    assert {name: to_pairs(values) for name, values in columns["macd"].items()} == rows["macd"]
+
+
+def test_market_indicators_batches_watchlist(monkeypatch, sample_prices):
+    requested = []
+
+    def fake_fetch_prices_many(tickers, period="1y", interval="1d"):
+        requested.append(tickers)
+        return {"AAA": sample_prices, "BBB": sample_prices.iloc[:60], "NAN": sample_prices.assign(close=float("nan"))}
+
+    monkeypatch.setattr(main, "fetch_prices_many", fake_fetch_prices_many)
+    client = TestClient(main.app)
+
+    data = client.get("/api/market/indicators?tickers=AAA, BBB,MISSING,NAN,AAA").json()
+    assert requested == [["AAA", "BBB", "MISSING", "NAN"]]
+    assert data["missing"] == ["MISSING", "NAN"]
+    assert data["indicators"]["AAA"]["sma_200"] == pytest.approx(101.0580087672747, rel=1e-6)
+    assert data["indicators"]["BBB"]["sma_200"] is None
+    assert client.get("/api/market/indicators?tickers=,").status_code == 422
@@ -1,6 +1,16 @@
+import math
+
+import numpy as np
+import pandas as pd
 import pytest
 
-from backend.calculations import compute_indicators
+from backend.calculations import (
+    _compute_indicators_pandas,
+    compute_indicator_series,
+    compute_indicators,
+    compute_indicators_many,
+    to_soa,
+)
 
 
 def test_compute_indicators_expected_values(sample_prices):
@@ -24,3 +34,130 @@ def test_compute_indicators_expected_values(sample_prices):
     assert bb["upper"] == pytest.approx(99.22430998302828, rel=1e-6)
     assert bb["middle"] == pytest.approx(97.632585192431, rel=1e-6)
     assert bb["lower"] == pytest.approx(96.04086040183371, rel=1e-6)
+
+
+def _flatten(indicators):
+    return [
+        indicators["rsi_14"],
+        indicators["sma_50"],
+        indicators["sma_200"],
+        indicators["ema_20"],
+        *indicators["macd"].values(),
+        *indicators["bollinger_bands"].values(),
+    ]
+
+
+def test_kernel_matches_pandas_reference(sample_prices):
+    kernel = compute_indicators(sample_prices)
+    reference = _compute_indicators_pandas(sample_prices)
+
+    # MACD is a difference of two price-scale EMAs, so compare it with an absolute floor too
+    assert np.allclose(_flatten(kernel), _flatten(reference), rtol=1e-12, atol=1e-12)
+    assert kernel["signals"] == reference["signals"]
+    assert reference["rsi_14"] == pytest.approx(75.25181892478082, rel=1e-6)
+
+
+def test_compute_indicators_caches_per_ticker_until_new_bar(sample_prices):
+    first = compute_indicators(sample_prices, ticker="CACHE")
+    assert compute_indicators(sample_prices, ticker="CACHE") is first
+
+    shorter = compute_indicators(sample_prices.iloc[:-1], ticker="CACHE")
+    assert shorter is not first
+    assert shorter["sma_50"] != first["sma_50"]
+
+
+def test_rsi_without_losses_is_overbought_and_flat_is_nan(sample_prices):
+    rising = sample_prices.assign(close=np.linspace(100, 120, len(sample_prices)))
+    flat = sample_prices.assign(close=100.0)
+
+    for compute in (compute_indicators, _compute_indicators_pandas):
+        assert compute(rising)["rsi_14"] == 100.0
+        assert compute(rising)["signals"]["rsi_state"] == "Overbought"
+        assert np.isnan(compute(flat)["rsi_14"])
+    assert (compute_indicator_series(rising)["rsi"][1:] == 100.0).all()
+
+
+@pytest.fixture
+def long_intraday_prices() -> pd.DataFrame:
+    """
+    200k one-minute bars of a geometric random walk: long enough for running-sum drift to show up.
+    """
+    rng = np.random.default_rng(0)
+    close = 1e4 * np.exp(np.cumsum(rng.normal(0, 0.01, 200_000)))
+    idx = pd.date_range("2020-01-01", periods=close.size, freq="min")
+    return pd.DataFrame({"close": close}, index=idx)
+
+
+def test_running_sum_smas_do_not_drift_on_long_histories(long_intraday_prices):
+    close = long_intraday_prices["close"].to_numpy()
+    indicators = compute_indicators(long_intraday_prices)
+
+    assert indicators["sma_50"] == pytest.approx(math.fsum(close[-50:]) / 50, rel=1e-12)
+    assert indicators["sma_200"] == pytest.approx(math.fsum(close[-200:]) / 200, rel=1e-12)
+
+
+@pytest.mark.parametrize("offset_noise", [False, True], ids=["random-walk", "offset-noise"])
+def test_sliding_bollinger_std_stays_exact_on_long_histories(long_intraday_prices, offset_noise):
+    prices = long_intraday_prices
+    if offset_noise:
+        # Huge mean, tiny spread: sum-of-squares variance cancels to garbage (even negative) here
+        prices = prices.assign(close=1e6 + np.random.default_rng(1).normal(0, 0.01, len(prices)))
+    window = prices["close"].to_numpy()[-20:]
+    bb = compute_indicators(prices)["bollinger_bands"]
+
+    assert (bb["upper"] - bb["middle"]) / 2 == pytest.approx(window.std(), rel=1e-6)
+    assert bb["middle"] == pytest.approx(math.fsum(window) / 20, rel=1e-12)
+
+
+def test_soa_input_matches_dataframe(sample_prices):
+    soa = to_soa(sample_prices)
+    assert to_soa(soa) is soa
+    assert all(arr.flags.c_contiguous and arr.dtype == np.float64 for arr in (soa.open, soa.close, soa.volume))
+    assert _flatten(compute_indicators(soa)) == _flatten(compute_indicators(sample_prices))
+
+
+def test_fused_macd_series_match_pandas_ewm(sample_prices):
+    series = compute_indicator_series(sample_prices)
+
+    close = sample_prices["close"]
+    macd = close.ewm(span=12, adjust=False).mean() - close.ewm(span=26, adjust=False).mean()
+    signal = macd.ewm(span=9, adjust=False).mean()
+    for name, expected in (("macd", macd), ("signal", signal), ("histogram", macd - signal)):
+        assert np.allclose(series[name], expected.to_numpy(), rtol=1e-12, atol=1e-12), name
+
+    assert series["macd"][-1] == pytest.approx(0.10522781432237593, rel=1e-6)
+    assert series["signal"][-1] == pytest.approx(-0.2480240583127879, rel=1e-6)
+    assert series["histogram"][-1] == pytest.approx(0.35325187263516383, rel=1e-6)
+
+
+def test_compute_indicators_many_matches_per_ticker(sample_prices):
+    frames = {"FULL": sample_prices, "SHORT": sample_prices.iloc[:30], "ONE": sample_prices.iloc[:1]}
+    batch = compute_indicators_many(frames)
+
+    assert list(batch) == list(frames)
+    for ticker, frame in frames.items():
+        single = compute_indicators(frame)
+        assert np.allclose(_flatten(batch[ticker]), _flatten(single), equal_nan=True), ticker
+        assert batch[ticker]["signals"] == single["signals"]
+    assert compute_indicators_many({}) == {}
+    with pytest.raises(ValueError):
+        compute_indicators_many({"EMPTY": sample_prices.iloc[:0]})
+
+
+def test_non_finite_close_is_dropped_instead_of_poisoning_state(sample_prices):
+    gapped = sample_prices.copy()
+    gapped.iloc[100, gapped.columns.get_loc("close")] = np.nan
+    gapped.iloc[150, gapped.columns.get_loc("close")] = np.inf
+    clean = gapped.drop(gapped.index[[100, 150]])
+
+    indicators = compute_indicators(gapped)
+    # 198 bars left, so only sma_200 is legitimately undefined
+    assert all(math.isfinite(v) for v in _flatten({**indicators, "sma_200": 0.0}))
+    assert np.array_equal(_flatten(indicators), _flatten(compute_indicators(clean)), equal_nan=True)
+    assert indicators["signals"] == compute_indicators(clean)["signals"]
+
+    series = compute_indicator_series(gapped)
+    assert len(to_soa(gapped)) == len(series["ema20"]) == len(sample_prices) - 2
+    assert np.isfinite(series["ema20"]).all() and np.isfinite(series["macd"]).all()
+    batched = compute_indicators_many({"GAP": gapped})["GAP"]
+    assert np.array_equal(_flatten(batched), _flatten(indicators), equal_nan=True)
@@ -0,0 +1,69 @@
+import json
+from types import SimpleNamespace
+
+from backend.agents import graph
+
+
+class FakeClient:
+    def __init__(self):
+        self.calls = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        content = json.dumps(
+            {"executive_summary": "ok", "technical_outlook": "-", "risks": "-", "strategy": "-"}
+        )
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def test_writer_reuses_cached_draft_for_identical_inputs():
+    graph._draft_cache.clear()
+    client = FakeClient()
+    state = {
+        "ticker": "TEST",
+        "raw_prices": None,
+        "technical_indicators": {"rsi_14": 55.0},
+        "news_data": [{"title": "headline"}],
+        "draft_report": {},
+        "critic_feedback": "",
+        "revision_count": 0,
+    }
+
+    first = graph.writer_node(state, client=client)["draft_report"]
+    first["confidence"] = "Low"
+    second = graph.writer_node(state, client=client)["draft_report"]
+
+    assert len(client.calls) == 1
+    assert client.calls[0]["extra_body"]["prompt_cache_key"]
+    assert second["executive_summary"] == "ok"
+    assert second["technical_indicators"] == {"rsi_14": 55.0}
+    assert second.get("confidence") != "Low"
+
+    graph.writer_node({**state, "critic_feedback": "Missing keys: risks"}, client=client)
+    assert len(client.calls) == 2
+    graph._draft_cache.clear()
+
+
+def test_cached_draft_passes_critic_with_nan_indicators():
+    graph._draft_cache.clear()
+    client = FakeClient()
+
+    def fresh_indicators():
+        return {"rsi_14": 61.0, "sma_200": float("nan")}
+
+    state = {
+        "ticker": "NAN",
+        "raw_prices": None,
+        "technical_indicators": fresh_indicators(),
+        "news_data": [],
+        "draft_report": {},
+        "critic_feedback": "",
+        "revision_count": 0,
+    }
+    graph.writer_node(state, client=client)
+
+    rerun = graph.writer_node({**state, "technical_indicators": fresh_indicators()}, client=client)
+    assert len(client.calls) == 1
+    assert graph.critic_node(rerun)["critic_feedback"] == ""
+    graph._draft_cache.clear()
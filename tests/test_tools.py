@@ -0,0 +1,87 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from backend.agents import tools
+
+
+def test_fetch_prices_memoizes_within_ttl_bucket(monkeypatch, sample_prices):
+    calls = []
+
+    def fake_download(ticker, **kwargs):
+        calls.append(ticker)
+        return sample_prices.rename(columns=str.title)
+
+    monkeypatch.setattr(tools.yf, "download", fake_download)
+    tools._price_cache.clear()
+
+    first = tools.fetch_prices("TEST")
+    second = tools.fetch_prices("TEST")
+    assert calls == ["TEST"]
+    assert second is first
+    assert list(first.columns) == ["open", "high", "low", "close", "volume"]
+
+    # Retry policy only affects how a miss is fetched, not what is cached
+    assert tools.fetch_prices("TEST", max_retries=5, backoff=0.1) is first
+    assert calls == ["TEST"]
+
+    monkeypatch.setattr(tools, "_price_cache_bucket", lambda interval: -1)
+    tools.fetch_prices("TEST")
+    assert calls == ["TEST", "TEST"]
+    tools._price_cache.clear()
+
+
+def test_fetch_prices_many_splits_batched_frame(monkeypatch, sample_prices):
+    calls = []
+
+    def fake_download(tickers, **kwargs):
+        calls.append(tickers)
+        symbols = tickers.split()
+        frame = sample_prices.rename(columns=str.title)
+        found = {t: frame for t in symbols if t != "MISSING"}
+        return pd.concat(found, axis=1) if found else pd.DataFrame()
+
+    monkeypatch.setattr(tools.yf, "download", fake_download)
+    monkeypatch.setattr(tools, "YF_BATCH_SIZE", 2)
+
+    frames = tools.fetch_prices_many(["AAA", "BBB", "AAA", "MISSING"])
+    assert calls == ["AAA BBB", "MISSING"]
+    assert sorted(frames) == ["AAA", "BBB"]
+    assert list(frames["AAA"].columns) == ["open", "high", "low", "close", "volume"]
+    assert len(frames["BBB"]) == len(sample_prices)
+
+
+def test_fetch_prices_coalesces_concurrent_misses(monkeypatch, sample_prices):
+    calls = []
+
+    def slow_download(ticker, **kwargs):
+        calls.append(ticker)
+        time.sleep(0.2)
+        return sample_prices.rename(columns=str.title)
+
+    monkeypatch.setattr(tools.yf, "download", slow_download)
+    tools._price_cache.clear()
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        frames = list(pool.map(lambda _: tools.fetch_prices("TEST"), range(4)))
+
+    assert calls == ["TEST"]
+    assert all(frame is frames[0] for frame in frames)
+    assert tools._inflight == {}
+    tools._price_cache.clear()
+
+
+def test_fetch_prices_retries_with_exponential_backoff(monkeypatch, sample_prices):
+    responses = [pd.DataFrame(), pd.DataFrame(), sample_prices.rename(columns=str.title)]
+    sleeps = []
+
+    monkeypatch.setattr(tools.yf, "download", lambda ticker, **kwargs: responses.pop(0))
+    monkeypatch.setattr(tools.time, "sleep", sleeps.append)
+    monkeypatch.setattr(tools.random, "uniform", lambda a, b: 0.0)
+    tools._price_cache.clear()
+
+    df = tools.fetch_prices("RETRY", backoff=0.5)
+    assert "close" in df.columns
+    assert sleeps == [0.5, 1.0]
+    tools._price_cache.clear()